@@ -0,0 +1,57 @@
+#!/bin/sh
+
+# Copyright (c) 2020 - for information on the respective copyright owner
+# see the NOTICE file and/or the repository
+# <https://github.com/boschresearch/amira-blender-rendering>.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Render a dataset with multiple parallel (headless) blender processes on a
+# single machine. Each process renders a disjoint shard of the scenes (see
+# dataset.shard_id and dataset.shard_count in the configuration) into the same
+# output directory. Since filenames use global scene indices, no merge step is
+# required.
+#
+# Usage:
+#   render_shards.sh NUM_SHARDS [abrgen arguments]
+#
+# If NUM_GPUS is set in the environment, shard i is pinned to GPU i % NUM_GPUS
+# via CUDA_VISIBLE_DEVICES.
+#
+# Example:
+#   NUM_GPUS=2 render_shards.sh 4 --config $AMIRA_DATA/configs/workstation_scenarios.cfg --abr-path ~/amira/abr/src
+
+if [ $# -lt 2 ];
+then
+    echo "Usage: $0 NUM_SHARDS [abrgen arguments]"
+    exit 1
+fi
+
+NUM_SHARDS=$1
+shift
+
+i=0
+while [ $i -lt $NUM_SHARDS ];
+do
+    if [ -n "$NUM_GPUS" ];
+    then
+        export CUDA_VISIBLE_DEVICES=$((i % NUM_GPUS))
+    fi
+    echo "Starting shard $i/$NUM_SHARDS (log: render_shard_$i.log)"
+    abrgen "$@" --dataset.shard_id $i --dataset.shard_count $NUM_SHARDS > render_shard_$i.log 2>&1 &
+    i=$((i + 1))
+done
+
+# wait for all shards to finish
+wait
+echo "All shards done"
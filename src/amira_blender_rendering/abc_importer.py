@@ -25,7 +25,7 @@ import numpy as np
 import bpy
 
 import amira_blender_rendering.utils.logging as log_utils
-from amira_blender_rendering.utils.blender import get_collection_item_names, find_new_items
+from amira_blender_rendering.utils.blender import get_collection_item_names, find_new_items, deselect_all
 from amira_blender_rendering.utils.material import MetallicMaterialGenerator, set_viewport_shader
 
 
@@ -250,7 +250,7 @@ class STLImporter(object):
     @staticmethod
     def _set_origin_to_center(obj):
         """Set mesh origin (coordinate system) to geomtric center"""
-        bpy.ops.object.select_all(action='DESELECT')
+        deselect_all()
         obj.select_set(True)
         bpy.ops.object.origin_set(type='ORIGIN_CENTER_OF_MASS')
         obj.select_set(False)
@@ -278,7 +278,7 @@ class STLImporter(object):
 
         _scene = bpy.data.scenes[scene]
 
-        bpy.ops.object.select_all(action='DESELECT')
+        deselect_all()
         obj.select_set(True)
 
         if _scene.rigidbody_world is None:
@@ -397,7 +397,7 @@ class ABCImporter(object):
             stl_fullpath, name, size_limits=(lower_limit, upper_limit), mass=mass, collision_margin=collision_margin)
 
         if not rescale_success:
-            bpy.ops.object.select_all(action="DESELECT")
+            deselect_all()
             # bpy.context.scene.objects.active = None
             obj_handle.select_set(True)
             bpy.ops.object.delete()
@@ -441,8 +441,7 @@ if __name__ == "__main__":
             obj, _ = abc_importer.import_object()
             if obj is None:
                 continue
-            obj.location.x = x * step
-            obj.location.y = y * step
+            obj.location = (x * step, y * step, obj.location.z)
     out = osp.join(out_dir, "mix.blend")
     bpy.ops.wm.save_as_mainfile(filepath=out)
     logger.info("finished, saved file to {}".format(out))
@@ -463,8 +462,7 @@ if __name__ == "__main__":
                 obj, _ = abc_importer.import_object(object_type=obj_t)
                 if obj is None:
                     continue
-                obj.location.x = x * step
-                obj.location.y = y * step
+                obj.location = (x * step, y * step, obj.location.z)
 
         out = osp.join(out_dir, "{}.blend".format(obj_t))
         bpy.ops.wm.save_as_mainfile(filepath=out)
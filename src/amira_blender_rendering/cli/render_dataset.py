@@ -226,7 +226,6 @@ def main():
     scene.dump_config()
 
     # generate the dataset
-    success = False
     success = scene.generate_dataset()
     if not success:
         logger.error("Error while generating dataset")
@@ -33,6 +33,9 @@ def get_environment_textures(base_path):
 
     Args:
         cfg(Configuration): config with render setup
+
+    Returns:
+        list of (already expanded) texture file paths
     """
     # this rise a KeyError if 'environment_texture' not in cfg
     environment_textures = expandpath(base_path)
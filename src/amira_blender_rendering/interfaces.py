@@ -23,38 +23,76 @@ In particular, it specifies how rendering results should be stored.
 
 import os
 import pathlib
+import shutil
+from datetime import datetime
 import bpy
-from math import ceil, log
 from amira_blender_rendering.datastructures import filter_state_keys
 from amira_blender_rendering.math.geometry import rotation_matrix_to_quaternion
 from amira_blender_rendering.utils.logging import get_logger
-import amira_blender_rendering.utils.blender as blnd
+from amira_blender_rendering.utils.io import get_format_width
 
 logger = get_logger()
 
+try:
+    import fcntl
+except ImportError:
+    # e.g. on Windows, where reflinks are not available
+    fcntl = None
+
+# FICLONE ioctl request from linux/fs.h, i.e. _IOW(0x94, 9, int). It clones (reflinks) a
+# file on copy-on-write filesystems such as btrfs or XFS by sharing the data blocks
+_FICLONE = 0x40049409
+
 
 def _setup_logpath_on_error(logpath: str):
-    "Add current time to given logpath"
-    from datetime import datetime
-    now = datetime.now().strftime('%Y-%m-%d_%H:%M:%S')
+    "Add current time (with microseconds, such that directories are unique) to given logpath"
+    now = datetime.now().strftime('%Y-%m-%d_%H%M%S_%f')
     return os.path.join(logpath, now)
 
 
-def _save_data_on_error(scn_str, view_str, rgb_base_path, mask_base_path, logpath, objs):
+def _fast_copy(srcpath: str, dstpath: str):
+    """Copy srcpath to dstpath, as a reflink if the filesystem supports it.
+
+    A reflink only copies metadata. Otherwise fall back to shutil.copyfile,
+    which copies in kernel space (sendfile) on Linux.
+
+    Args:
+        srcpath(str): path of the file to copy
+        dstpath(str): path of the destination file
+    """
+    if fcntl is not None:
+        try:
+            with open(srcpath, 'rb') as fsrc, open(dstpath, 'wb') as fdst:
+                fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+            return
+        except OSError:
+            # not supported, e.g. different filesystems or no copy-on-write
+            pass
+    shutil.copyfile(srcpath, dstpath)
+
+
+def _save_data_on_error(scn_str, view_str, rgb_base_path, mask_base_path, logpath, mask_ids):
     "Save additional images to file"
-    from shutil import copyfile
     logger.error('Saving to blender on error. Dumping additional image data')
     # copy rgb
     rgbname = scn_str[1:] + view_str + '.png'
-    srcpath = os.path.join(rgb_base_path, rgbname)
-    dstpath = os.path.join(logpath, rgbname)
-    copyfile(srcpath, dstpath)
+    _fast_copy(os.path.join(rgb_base_path, rgbname), os.path.join(logpath, rgbname))
     # copy masks
-    for obj in objs:
-        maskname = scn_str[1:] + view_str + f'{obj["id_mask"]}.png'
-        srcpath = os.path.join(mask_base_path, maskname)
-        dstpath = os.path.join(logpath, maskname)
-        copyfile(srcpath, dstpath)
+    for mask_id in mask_ids:
+        maskname = scn_str[1:] + view_str + f'{mask_id}.png'
+        _fast_copy(os.path.join(mask_base_path, maskname), os.path.join(logpath, maskname))
+
+
+def _save_blend_copy(filepath: str):
+    """Save a compressed copy of the current blender session to filepath.
+
+    Saving as copy leaves the filepath of the current session untouched, so
+    relative paths are not remapped for subsequent renderings.
+
+    Args:
+        filepath(str): path where .blend file is saved
+    """
+    bpy.ops.wm.save_as_mainfile(filepath=filepath, compress=True, copy=True)
 
 
 def _save_camera_locations_to_blend(name: str, locations: list, filepath: str):
@@ -73,32 +111,39 @@ def _save_camera_locations_to_blend(name: str, locations: list, filepath: str):
     tmp_cam_coll = bpy.data.collections.new('TemporaryCameras')
     bpy.context.scene.collection.children.link(tmp_cam_coll)
 
+    # copy the camera object via the data API, which is much cheaper than the duplicate
+    # operator. Copies share the camera data and are only linked to the temporary collection
+    cam_obj = bpy.data.objects[name]
     tmp_cameras = []
     for location in locations:
-        blnd.select_object(name)
-        bpy.ops.object.duplicate()
-        # TODO: remove from original collection to avoid name clutter in .blend
-        tmp_cam_obj = bpy.context.object
+        tmp_cam_obj = cam_obj.copy()
         tmp_cam_obj.location = location
         tmp_cam_coll.objects.link(tmp_cam_obj)
         tmp_cameras.append(tmp_cam_obj)
     bpy.context.evaluated_depsgraph_get().update()
 
     logger.info(f"Saving camera locations to blender file {filepath} for debugging")
-    bpy.ops.wm.save_as_mainfile(filepath=filepath)
+    _save_blend_copy(filepath)
 
     # clear objects and collection
-    bpy.ops.object.select_all(action='DESELECT')
     for tmp_cam in tmp_cameras:
         bpy.data.objects.remove(tmp_cam)
     bpy.data.collections.remove(tmp_cam_coll)
 
 
+class RepeatFrame(Exception):
+    """Raised within a scene's render loop to discard the current static scene and re-generate it"""
+    pass
+
+
 # TODO: derive scenes in abr.scenes from this class
 class ABRScene():
     """interface of functions that each sccene needs to adhere to"""
     def __init__(self):
-        pass
+        # scene and view format widths for debug filenames, see _get_debug_format_widths
+        self._debug_format_widths = None
+        # directories already created in this run, see _ensure_dir
+        self._dirs_created = set()
 
     def dump_config(self):
         raise NotImplementedError()
@@ -112,6 +157,21 @@ class ABRScene():
     def teardown():
         raise NotImplementedError()
 
+    def _ensure_dir(self, path: str):
+        """Create directory path (and parents) unless it was already created in this run"""
+        if path in self._dirs_created:
+            return
+        pathlib.Path(path).mkdir(parents=True, exist_ok=True)
+        self._dirs_created.add(path)
+
+    def _get_debug_format_widths(self):
+        """Return (scene, view) format widths for debug filenames, computed once per run"""
+        if self._debug_format_widths is None:
+            self._debug_format_widths = (
+                get_format_width(self.config.dataset.scene_count),
+                get_format_width(self.config.dataset.view_count))
+        return self._debug_format_widths
+
     def save_to_blend(self, dirinfo, **kw):
         """
         Save debug data to .blend files
@@ -157,7 +217,7 @@ class ABRScene():
 
         if camera_name is not None and camera_locations is not None:
             # setup path
-            pathlib.Path(logpath).mkdir(parents=True, exist_ok=True)
+            self._ensure_dir(logpath)
             # dump
             _save_camera_locations_to_blend(
                 name=camera_name,
@@ -168,15 +228,15 @@ class ABRScene():
             # (if necessary) modify path and set up
             if on_error:
                 logpath = _setup_logpath_on_error(logpath)
-            pathlib.Path(logpath).mkdir(parents=True, exist_ok=True)
+            self._ensure_dir(logpath)
             
             # file specs
-            scn_frmt_w = int(ceil(log(self.config.dataset.scene_count, 10)))
-            view_frmt_w = int(ceil(log(self.config.dataset.view_count, 10)))
+            scn_frmt_w, view_frmt_w = self._get_debug_format_widths()
             scn_str = f'_s{scn_idx:0{scn_frmt_w}}'
             view_str = f'_v{view_idx:0{view_frmt_w}}'
 
-            # on error we save additional files
+            # on error we save additional files. This must complete before returning, since
+            # the failed frame is re-rendered under the same filenames afterwards
             if on_error:
                 _save_data_on_error(
                     scn_str,
@@ -184,18 +244,18 @@ class ABRScene():
                     dirinfo.images.rgb,
                     dirinfo.images.mask,
                     logpath,
-                    self.objs)
+                    [obj['id_mask'] for obj in self.objs])
 
             # finally save to blend
             filename = basefilename + scn_str + view_str + '.blend'
             filepath = os.path.join(logpath, filename)
             logger.info(f"Saving current scene/view to blender file {filepath} for debugging")
-            bpy.ops.wm.save_as_mainfile(filepath=filepath)
+            _save_blend_copy(filepath)
             
         else:
-            pathlib.Path(logpath).mkdir(parents=True, exist_ok=True)
+            self._ensure_dir(logpath)
             logger.info('Saving current active scene to blender for debugging')
-            bpy.ops.wm.save_as_mainfile(filepath=os.path.join(logpath, basefilename + '.blend'))
+            _save_blend_copy(os.path.join(logpath, basefilename + '.blend'))
 
 
 # NOTE: the functions and classes below were taken from amira_perception. Make
@@ -353,6 +413,5 @@ def try_rotation_to_quaternion(rotation):
         else:
             q = rotation.flatten()
             if q.shape != (4,):
-                q = None
                 raise ValueError('Rotation must be either a (3,3) matrix or a (4,) quaternion (WXYZ)')
     return q
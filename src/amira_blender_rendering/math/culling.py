@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 - for information on the respective copyright owner
+# see the NOTICE file and/or the repository
+# <https://github.com/boschresearch/amira-blender-rendering>.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Numeric kernels for cheap rejection tests, such as view frustum culling of
+bounding spheres and tests whether projected points fall inside the image.
+
+If numba is available, the kernels are jit-compiled loops which exit as early
+as possible. Otherwise, vectorized numpy implementations with the same
+signature are used. All arrays are expected to be contiguous float64 arrays.
+"""
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    # numba is optional. Fall back to numpy implementations
+    numba = None
+
+
+def _frustum_sphere_cull_numpy(planes, centers, radii):
+    dist = centers @ planes[:, :3].T + planes[:, 3]
+    return np.all(dist >= -radii[:, None], axis=1)
+
+
+def _frustum_sphere_cull_loop(planes, centers, radii):
+    n = centers.shape[0]
+    mask = np.ones(n, dtype=np.bool_)
+    for i in range(n):
+        for k in range(planes.shape[0]):
+            dist = planes[k, 0] * centers[i, 0] + planes[k, 1] * centers[i, 1] + \
+                planes[k, 2] * centers[i, 2] + planes[k, 3]
+            if dist < -radii[i]:
+                mask[i] = False
+                break
+    return mask
+
+
+def _points_in_image_numpy(mvp, points, scale_x, scale_y, width, height):
+    p_hom = points @ mvp[:, :3].T + mvp[:, 3]
+    w = p_hom[:, 3]
+    if np.any(w == 0.0):
+        return np.zeros(points.shape[0], dtype=np.bool_), False
+    px = scale_x * (p_hom[:, 0] / w + 1.0)
+    py = scale_y * (p_hom[:, 1] / w - 1.0)
+    return (px >= 0) & (px < width) & (py >= 0) & (py < height), True
+
+
+def _points_in_image_loop(mvp, points, scale_x, scale_y, width, height):
+    n = points.shape[0]
+    mask = np.zeros(n, dtype=np.bool_)
+    for i in range(n):
+        x, y, z = points[i, 0], points[i, 1], points[i, 2]
+        w = mvp[3, 0] * x + mvp[3, 1] * y + mvp[3, 2] * z + mvp[3, 3]
+        if w == 0.0:
+            return np.zeros(n, dtype=np.bool_), False
+        px = scale_x * ((mvp[0, 0] * x + mvp[0, 1] * y + mvp[0, 2] * z + mvp[0, 3]) / w + 1.0)
+        py = scale_y * ((mvp[1, 0] * x + mvp[1, 1] * y + mvp[1, 2] * z + mvp[1, 3]) / w - 1.0)
+        mask[i] = px >= 0 and px < width and py >= 0 and py < height
+    return mask, True
+
+
+if numba is not None:
+    _frustum_sphere_cull = numba.njit(cache=True)(_frustum_sphere_cull_loop)
+    _points_in_image = numba.njit(cache=True)(_points_in_image_loop)
+else:
+    _frustum_sphere_cull = _frustum_sphere_cull_numpy
+    _points_in_image = _points_in_image_numpy
+
+
+def frustum_sphere_cull(planes, centers, radii):
+    """Test which bounding spheres are (partially) inside a frustum.
+
+    Args:
+        planes(np.array(K,4)): planes (nx, ny, nz, d) with normals pointing inside the frustum
+        centers(np.array(N,3)): sphere centers
+        radii(np.array(N,)): sphere radii
+
+    Returns:
+        np.array(N,) of bool, False for spheres lying completely behind any of the planes
+    """
+    return _frustum_sphere_cull(
+        np.ascontiguousarray(planes, dtype=np.float64),
+        np.ascontiguousarray(centers, dtype=np.float64),
+        np.ascontiguousarray(radii, dtype=np.float64))
+
+
+def points_in_image(mvp, points, scale_x, scale_y, width, height):
+    """Project points to pixel coordinates and test which of them fall inside the image.
+
+    Pixel coordinates are computed as
+        (scale_x * (x / w + 1), scale_y * (y / w - 1))
+    with (x, y, z, w) = mvp @ (p, 1), see also geometry.p2d_to_pixel_coords.
+
+    Args:
+        mvp(np.array(4,4)): model-view-projection matrix
+        points(np.array(N,3)): points in world coordinates
+        scale_x(float): pixel scale along x, i.e. (resolution_x - 1) / 2
+        scale_y(float): pixel scale along y, i.e. (resolution_y - 1) / -2
+        width(int): image width (pixel)
+        height(int): image height (pixel)
+
+    Returns:
+        tuple (mask, valid) with np.array(N,) of bool, True for points inside the image,
+        and valid False if any point cannot be projected (w == 0), in which case mask is all False
+    """
+    mask, valid = _points_in_image(
+        np.ascontiguousarray(mvp, dtype=np.float64),
+        np.ascontiguousarray(points, dtype=np.float64).reshape(-1, 3),
+        float(scale_x), float(scale_y), float(width), float(height))
+    return mask, bool(valid)
+
+
+def warmup():
+    """Compile the jit kernels, or load them from numba's on-disk cache, using tiny inputs.
+
+    Call this once during setup, such that the first (timed) use of a kernel does
+    not pay for compilation. Without numba, this is a no-op.
+    """
+    if numba is None:
+        return
+    frustum_sphere_cull(np.zeros((1, 4)), np.zeros((1, 3)), np.zeros(1))
+    points_in_image(np.eye(4), np.zeros((1, 3)), 1.0, -1.0, 2, 2)
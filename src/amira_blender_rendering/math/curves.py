@@ -49,12 +49,12 @@ def generate_points_on_sphere(n):
     x = 0.1 + 1.2 * n
     s0 = (-1 + 1 / (n - 1))
     ds = (2 - 2 / (n - 1)) / (n - 1)
-    list_of_points = [
-        spherical_coordinate(
-            (s0 + i * ds) * x,
-            np.pi / 2. * np.copysign(1, (s0 + i * ds)) * (1. - np.sqrt(1. - abs((s0 + i * ds))))
-        ) for i in range(n)]
-    return np.array(list_of_points)
+    # all points at once: spherical_coordinate works element-wise on arrays
+    s = s0 + np.arange(n) * ds
+    return spherical_coordinate(
+        s * x,
+        np.pi / 2. * np.copysign(1, s) * (1. - np.sqrt(1. - np.abs(s)))
+    ).T
 
 
 def points_on_viewsphere(num_points=30, scale=1, bias=(0, 0, 1.5)):
@@ -70,24 +70,16 @@ def points_on_viewsphere(num_points=30, scale=1, bias=(0, 0, 1.5)):
     """
     sphere_locations = generate_points_on_sphere(2 * num_points)
 
-    if isinstance(scale, (int, float)):
-        scale = [scale] * 3
-
-    if isinstance(scale, (int, float)):
-        bias = [bias] * 3
-
-    half_sphere_locations = []
-    for loc in sphere_locations:
-        if loc[-1] >= 0:
-            loc = [scale[i] * x + bias[i] for i, x in enumerate(loc)]
-            half_sphere_locations.append(tuple(loc))
+    # keep the upper half, then scale and bias (scalars or per-axis) all locations at once
+    half_sphere_locations = sphere_locations[sphere_locations[:, -1] >= 0]
+    half_sphere_locations = np.asarray(scale) * half_sphere_locations + np.asarray(bias)
 
     # corner case with 2 points --> locations are coincident
     if num_points == 1:
-        half_sphere_locations.pop(-1)
+        half_sphere_locations = half_sphere_locations[:-1]
     assert (len(half_sphere_locations) == num_points)
 
-    return np.array(half_sphere_locations)
+    return half_sphere_locations
 
 
 def points_on_bezier(num_points: int, p0: np.array, p1: np.array, p2: np.array, start: float = 0, stop: float = 1):
@@ -179,17 +171,16 @@ def points_on_piecewise_line(num_points: int, control_points: dict):
     length = np.sum(norms)
     cum_length = np.cumsum(norms)
     T = np.linspace(0, length, num_points, endpoint=True)
-    points = np.empty((num_points, control_points[0].size))
-
-    j = 0
-    current_length = 0
-    for i, t in enumerate(T):
-        if t >= cum_length[j]:
-            current_length = cum_length[j]
-            j += 1
-        points[i, :] = control_points[j]
-        if j < len(directions):
-            points[i, :] += (t - current_length) * directions[j]
+
+    # index of the segment each point lies on, and the curve length at the segment start
+    j = np.searchsorted(cum_length, T, side='right')
+    start_length = np.concatenate(([0.], cum_length))[j]
+
+    points = np.asarray(control_points, dtype=np.float64)[j]
+    on_segment = j < len(directions)
+    j_on = j[on_segment]
+    # offset along the unit direction of the segment
+    points[on_segment] += ((T - start_length)[on_segment] / norms[j_on])[:, None] * directions[j_on]
     return points
 
 
@@ -229,22 +220,16 @@ def plot_points(points, camera=None, plot_axis: bool = False, scatter: bool = Fa
             translations.append(t)
 
         length = 0.05
-        x_axis_0 = np.float32([length, 0, 0])
-        y_axis_0 = np.float32([0, length, 0])
-        z_axis_0 = np.float32([0, 0, length])
-
-        for R, t in zip(rotations, translations):
-            # compute transformed points
-            x_axis = R.dot(x_axis_0) + t
-            y_axis = R.dot(y_axis_0) + t
-            z_axis = R.dot(z_axis_0) + t
-            neg_z_axis = R.dot(-30 * z_axis_0) + t
-            # plot x
-            ax.plot([t[0], x_axis[0]], [t[1], x_axis[1]], [t[2], x_axis[2]], color='r')
-            # plot y
-            ax.plot([t[0], y_axis[0]], [t[1], y_axis[1]], [t[2], y_axis[2]], color='g')
-            # plot z
-            ax.plot([t[0], z_axis[0]], [t[1], z_axis[1]], [t[2], z_axis[2]], color='b')
-            # virtual neg z
-            ax.plot([t[0], neg_z_axis[0]], [t[1], neg_z_axis[1]], [t[2], neg_z_axis[2]], color='b', linestyle='--')
+        rotations = np.asarray(rotations)
+        t = np.asarray(translations)
+
+        # the rotated axes are the (scaled) columns of the rotation matrices. Plot the
+        # axes of all transforms with one call per axis, drawn as arrows without heads
+        for axis, color, scale, linestyle in ((0, 'r', length, '-'),
+                                              (1, 'g', length, '-'),
+                                              (2, 'b', length, '-'),
+                                              (2, 'b', -30 * length, '--')):  # virtual neg z
+            d = scale * rotations[:, :, axis]
+            ax.quiver(t[:, 0], t[:, 1], t[:, 2], d[:, 0], d[:, 1], d[:, 2],
+                      color=color, linestyle=linestyle, arrow_length_ratio=0)
     plt.show()
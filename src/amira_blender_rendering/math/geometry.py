@@ -27,6 +27,7 @@ from math import pi
 from mathutils import Vector, Euler
 from mathutils.bvhtree import BVHTree
 from amira_blender_rendering.utils.logging import get_logger
+from amira_blender_rendering.math import culling
 import numpy as np
 
 
@@ -229,7 +230,105 @@ def test_visibility(obj, cam, width, height, require_all=True):
         return all(oks) if require_all else any(oks)
 
 
-def test_occlusion(scene, layer, cam, obj, width, height, require_all=True, origin_offset=0.01):
+def get_camera_frustum_planes(cam, scene=None):
+    """Get the planes delimiting the view frustum of a perspective camera.
+
+    Each plane is given as (nx, ny, nz, d) with normal n pointing inside the
+    frustum, such that n.p + d >= 0 for all points p inside the frustum.
+
+    Args:
+        cam : Camera object
+        scene : scene used to compute the camera frame (aspect ratio). Default: active scene
+
+    Returns:
+        np.array(6,4) with side, near and far planes in world coordinates,
+        or None if the camera is not a perspective camera.
+    """
+    if cam.data.type != 'PERSP':
+        return None
+    scene = bpy.context.scene if scene is None else scene
+
+    mat = cam.matrix_world
+    origin = np.asarray(mat.translation)
+    corners = np.asarray([(mat @ c)[:] for c in cam.data.view_frame(scene=scene)])
+    center = corners.mean(axis=0)
+
+    planes = np.empty((6, 4))
+    # side planes through camera origin and two consecutive frame corners
+    for k in range(4):
+        n = np.cross(corners[k] - origin, corners[(k + 1) % 4] - origin)
+        n /= np.linalg.norm(n)
+        if np.dot(n, center - origin) < 0:
+            n = -n
+        planes[k, :3] = n
+        planes[k, 3] = -np.dot(n, origin)
+
+    # near and far planes along the viewing direction (cameras look along -z)
+    forward = -np.asarray(mat.to_3x3().col[2])
+    forward /= np.linalg.norm(forward)
+    planes[4, :3] = forward
+    planes[4, 3] = -np.dot(forward, origin + cam.data.clip_start * forward)
+    planes[5, :3] = -forward
+    planes[5, 3] = np.dot(forward, origin + cam.data.clip_end * forward)
+    return planes
+
+
+def get_bounding_spheres(objs):
+    """Get conservative bounding spheres for a list of objects, in world coordinates.
+
+    Args:
+        objs(list): list of bpy objects
+
+    Returns:
+        tuple (centers, radii) with np.array(N,3) sphere centers and np.array(N,) radii
+    """
+    if not objs:
+        return np.empty((0, 3)), np.empty((0,))
+    aabbs = get_world_aabbs(objs)
+    centers = aabbs.mean(axis=1)
+    radii = 0.5 * np.linalg.norm(aabbs[:, 1] - aabbs[:, 0], axis=1)
+    return centers, radii
+
+
+def test_spheres_in_frustum(planes, centers, radii):
+    """Cheap (conservative) test whether bounding spheres are (partially) inside a frustum.
+
+    A sphere is rejected only if it lies completely behind at least one of the planes.
+    Use this as pre-filter for more expensive visibility/occlusion tests.
+
+    Args:
+        planes(np.array(K,4)): frustum planes with inward normals, see get_camera_frustum_planes
+        centers(np.array(N,3)): sphere centers
+        radii(np.array(N,)): sphere radii
+
+    Returns:
+        np.array(N,) of bool, True if the corresponding sphere might be visible
+    """
+    return culling.frustum_sphere_cull(planes, centers, radii)
+
+
+def get_world_vertices(obj, depsgraph):
+    """Get the world coordinates of the vertices of an object, evaluated after simulations.
+
+    Args:
+        obj: object to evaluate
+        depsgraph: depsgraph to evaluate the object in
+
+    Returns:
+        np.array(N,3) of vertices in world coordinates
+    """
+    obj_eval = obj.evaluated_get(depsgraph)
+    mesh = obj_eval.to_mesh()
+    # read all vertex coordinates in one go, and transform them at once
+    co = np.empty(3 * len(mesh.vertices), dtype=np.float32)
+    mesh.vertices.foreach_get('co', co)
+    obj_eval.to_mesh_clear()
+    mat = np.array(obj.matrix_world)
+    return co.reshape(-1, 3) @ mat[:3, :3].T + mat[:3, 3]
+
+
+def test_occlusion(scene, layer, cam, obj, width, height, require_all=True, origin_offset=0.01,
+                   update_depsgraph=True, depsgraph=None, vertices=None):
     """Test if an object is visible or occluded by another object by checking its vertices.
     Note that this also tests if an object is visible.
 
@@ -245,6 +344,14 @@ def test_occlusion(scene, layer, cam, obj, width, height, require_all=True, orig
         origin_offset: for ray-casting, add this offset along the ray to the
             origin. This helps to prevent numerical issues when a mesh is exactly at
             cam's location.
+        update_depsgraph: update the depsgraph before evaluating the object.
+            Callers that test several objects against the same scene state can
+            update once themselves and pass False.
+        depsgraph: depsgraph to evaluate the object in. If None, the evaluated
+            depsgraph of the current context is used.
+        vertices: world coordinates (np.array(N,3)) of the object's vertices, see get_world_vertices.
+            Callers that test the same (static) object from several camera locations
+            can get them once and pass them. If None, they are computed from obj.
 
     Returns:
         True if an object is not visible or occluded, False if the object is
@@ -253,32 +360,42 @@ def test_occlusion(scene, layer, cam, obj, width, height, require_all=True, orig
         this function returns False if one of its vertices is visible and not
         occluded, and True if none of the vertex is visible or all are occluded.
     """
-    dg = bpy.context.evaluated_depsgraph_get()
-    dg.update()
+    dg = depsgraph if depsgraph is not None else bpy.context.evaluated_depsgraph_get()
+    if update_depsgraph:
+        dg.update()
     render = bpy.context.scene.render
 
-    # get mesh, evaluated after simulations, and camera origin from the camera's
+    # get vertices, evaluated after simulations, and camera origin from the camera's
     # world matrix
-    mesh = obj.evaluated_get(dg).to_mesh()
     origin = cam.matrix_world.to_translation()
-    vs = [obj.matrix_world @ v.co for v in mesh.vertices]
-    obj.to_mesh_clear()
+    vs = vertices if vertices is not None else get_world_vertices(obj, dg)
 
-    # compute projected vertices
-    ps = [project_p3d(v, cam, render=render) for v in vs]
-    if None in ps:
+    # compute pixel coordinates for each vertex. This is the same as
+    # project_p3d followed by p2d_to_pixel_coords, but builds the camera
+    # matrices only once for all vertices
+    mvp = cam.calc_matrix_camera(
+        dg,
+        x=render.resolution_x,
+        y=render.resolution_y,
+        scale_x=render.pixel_aspect_x,
+        scale_y=render.pixel_aspect_y) @ cam.matrix_world.inverted()
+    px_scale_x, px_scale_y = (render.resolution_x - 1) / 2.0, (render.resolution_y - 1) / -2.0
+    # keep track of what is going on. Projection and image bounds test run for all vertices at once
+    vs_visible, valid = culling.points_in_image(np.array(mvp), vs, px_scale_x, px_scale_y, width, height)
+    if not valid:
         return True
 
-    # compute pixel coordinates for each vertex
-    pxs = [p2d_to_pixel_coords(p, render=render) for p in ps]
-
-    # keep track of what is going on
-    vs_visible = [px[0] >= 0 and px[0] < width and px[1] >= 0 and px[1] < height for px in pxs]
-    vs_occluded = [False] * len(vs)
+    # cheap pre-check before any ray casting: the outcome is already known if a vertex
+    # falls outside of the image (require_all) or if no vertex is within the image
+    if require_all and not vs_visible.all():
+        return True
+    if not require_all and not vs_visible.any():
+        return True
 
-    for i, v in enumerate(vs):
+    # vertices outside of the image cannot contribute to the result
+    for i in np.flatnonzero(vs_visible):
         # compute direction of ray from camera to this vertex and perform cast
-        direction = v - origin
+        direction = Vector(vs[i]) - origin
         direction.normalize()
         # 'repair' the origin by walking along the ray by a little offset
         local_origin = origin + origin_offset * direction
@@ -292,16 +409,16 @@ def test_occlusion(scene, layer, cam, obj, width, height, require_all=True, orig
         hit_obj = hit_record[4]
 
         # assume hit
-        if hit and not (hit_obj.type == 'CAMERA') and not (hit_obj == obj):
-            vs_occluded[i] = True
+        occluded = hit and not (hit_obj.type == 'CAMERA') and not (hit_obj == obj)
+        if require_all and occluded:
+            # a single occluded vertex suffices
+            return True
+        if not require_all and not occluded:
+            # a single visible and not occluded vertex suffices
+            return False
 
-    if require_all:
-        return not (all(vs_visible) and all([not oc for oc in vs_occluded]))
-    else:
-        for i in range(len(vs_visible)):
-            if vs_visible[i] and not vs_occluded[i]:
-                return False
-        return True
+    # all vertices visible and none occluded (require_all), or none visible and not occluded
+    return not require_all
 
 
 def _get_bvh(obj):
@@ -319,6 +436,23 @@ def _get_bvh(obj):
     return BVHTree.FromPolygons(vs, ps)
 
 
+def get_world_aabbs(objs):
+    """Get the axis aligned bounding boxes of multiple objects in world coordinates
+
+    The bounding box corners of all objects are transformed at once.
+
+    Args:
+        objs(list): list of N bpy objects
+
+    Returns:
+        np.array(N,2,3) with min and max corners of the world aligned bounding boxes
+    """
+    mats = np.asarray([np.asarray(obj.matrix_world) for obj in objs]).reshape(-1, 4, 4)
+    corners = np.asarray([[c[:] for c in obj.bound_box] for obj in objs]).reshape(-1, 8, 3)
+    corners = np.einsum('nij,nkj->nki', mats[:, :3, :3], corners) + mats[:, None, :3, 3]
+    return np.stack((corners.min(axis=1), corners.max(axis=1)), axis=1)
+
+
 def test_intersection(obj1, obj2):
     """Test if two objects intersect each other
 
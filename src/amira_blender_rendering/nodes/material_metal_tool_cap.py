@@ -19,6 +19,7 @@
 import bpy
 from mathutils import Vector
 from amira_blender_rendering.utils.blender import clear_orphaned_materials, remove_material_nodes, add_default_material
+from amira_blender_rendering.utils.blender import deselect_all
 from amira_blender_rendering.utils import material as mutil
 # from amira_blender_rendering.utils.logging import get_logger
 
@@ -68,7 +69,7 @@ def setup_material(material: bpy.types.Material, empty: bpy.types.Object = None)
         empty.rotation_euler = obj.rotation_euler
 
         # deselect all
-        bpy.ops.object.select_all(action='DESELECT')
+        deselect_all()
 
         # take care to re-select everything
         empty.select_set(state=True)
@@ -31,15 +31,13 @@ def boundingbox_from_mask(mask):
     """
     assert len(mask.shape) == 2
 
-    # flatten to two dimensions and extract first and last non-zero entry
-    xs = np.sum(mask, axis=0)
-    ys = np.sum(mask, axis=1)
-    xs = np.nonzero(xs)
-    ys = np.nonzero(ys)
-    # raise error if non valid, i.e., empty mask, given
-    if (xs[0].shape[0] == 0) or (ys[0].shape[0] == 0):
+    # collapse to boolean column/row occupancy and extract first and last non-zero entry.
+    # Boolean reductions avoid accumulating the (float) mask values
+    xs = np.flatnonzero(np.any(mask, axis=0))
+    # return None if non valid, i.e., empty mask, given
+    if xs.size == 0:
         return None
-    x = (np.min(xs), np.max(xs))
-    y = (np.min(ys), np.max(ys))
-    return np.array([[x[0], y[0]],
-                     [x[1], y[1]]])
+    ys = np.flatnonzero(np.any(mask, axis=1))
+    # indices from flatnonzero are sorted, hence first and last are min and max
+    return np.array([[xs[0], ys[0]],
+                     [xs[-1], ys[-1]]])
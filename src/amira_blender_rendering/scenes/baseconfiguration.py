@@ -34,6 +34,15 @@ class BaseConfiguration(Configuration):
         self.add_param('dataset.view_count', 1, 'Number of camera views per scene to generate')
         self.add_param('dataset.base_path', '', 'Path to storage directory')
         self.add_param('dataset.scene_type', '', 'Scene type')
+        self.add_param('dataset.shard_count', 1,
+                       'Number of shards the scenes are split into, e.g., to render with multiple parallel processes')
+        self.add_param('dataset.shard_id', 0,
+                       'Index of the shard to render (in [0, shard_count)). Only scenes with index i such that'
+                       ' i % shard_count == shard_id are rendered')
+        self.add_param('dataset.seed', -1,
+                       'Seed for the random number generators used to sample object poses and textures.'
+                       ' A negative value (default) draws a fresh seed from the OS for each run.'
+                       ' The shard_id is combined with the seed, such that shards sample different poses')
 
         # camera configuration
         self.add_param('camera_info.name', 'Pinhole Camera', 'Name for the camera')
@@ -66,6 +75,13 @@ class BaseConfiguration(Configuration):
         self.add_param('render_setup.motion_blur', False,
                        'If True, toggle motion blur during rendering.'
                        ' Motion blur specific config must be set directly in the .blend blnderer scene')
+        self.add_param('render_setup.persistent_data', False,
+                       'If True, keep render data (e.g. BVH, textures) in memory between renders. Speeds up'
+                       ' consecutive renders, e.g. multiple views of the same scene, at the cost of memory')
+        self.add_param('render_setup.prefetch_textures', False,
+                       'If True, draw the environment texture of the next scene in advance and read it from disk'
+                       ' in a background thread while the current scene renders.'
+                       ' Useful for slow (e.g. network) storage')
 
         # debug
         self.add_param('debug.enabled', False, 'If True, enable debugging. For specifc flags refer to single scenes')
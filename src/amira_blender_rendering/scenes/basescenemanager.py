@@ -17,21 +17,38 @@
 # limitations under the License.
 
 import os
+import threading
 import bpy
+from collections import OrderedDict
 from amira_blender_rendering.utils import blender as blnd
 from amira_blender_rendering.utils.logging import get_logger
 
 
+def _read_file(filepath: str, chunk_size: int = 1 << 20):
+    """Read a file in chunks and discard its content, e.g. to warm up the OS file cache"""
+    try:
+        with open(filepath, 'rb') as f:
+            while f.read(chunk_size):
+                pass
+    except OSError:
+        pass
+
+
 class BaseSceneManager():
     """Class for arbitrary scenes that should be set up for rendering data.
 
     This class should act as an an entry point for arbitrary scenarios.
     """
 
+    # maximum number of texture images kept loaded by get_image
+    image_cache_size = 32
+
     def __init__(self):
         super(BaseSceneManager, self).__init__()
         self.init_default_blender_config()
         self.logger = get_logger()
+        # least recently used texture images, keyed by filepath
+        self._image_cache = OrderedDict()
 
     def init_default_blender_config(self):
         """This function is used to setup blender into a known configuration,
@@ -46,6 +63,55 @@ class BaseSceneManager():
         blnd.clear_all_objects()
         blnd.clear_orphaned_materials()
 
+    def get_image(self, filepath):
+        """Get the image data block for filepath, loading it only if it is not cached.
+
+        Textures are usually drawn from a limited set of files, so the same
+        image is requested many times during dataset generation. The least
+        recently used images are kept loaded, up to image_cache_size of them.
+        Evicted images are removed from blender, unless they are still in use.
+
+        Args:
+            filepath(str): path to image file
+
+        Returns:
+            bpy.types.Image
+        """
+        img = self._image_cache.get(filepath)
+        if img is not None:
+            try:
+                # access fails if the data block was removed meanwhile, e.g. by reset()
+                img.name
+                self._image_cache.move_to_end(filepath)
+                return img
+            except ReferenceError:
+                del self._image_cache[filepath]
+
+        img = blnd.load_img(filepath)
+        self._image_cache[filepath] = img
+        while len(self._image_cache) > self.image_cache_size:
+            _, old_img = self._image_cache.popitem(last=False)
+            try:
+                if old_img.users == 0:
+                    bpy.data.images.remove(old_img)
+            except ReferenceError:
+                pass
+        return img
+
+    def prefetch_image(self, filepath):
+        """Read an image file from disk in a background thread.
+
+        A subsequent get_image (and the render that uses the image) then finds the
+        file in the OS file cache. The thread only reads the file and does not touch
+        any blender data, since the bpy API is not thread-safe.
+
+        Args:
+            filepath(str): path to image file
+        """
+        if filepath in self._image_cache:
+            return
+        threading.Thread(target=_read_file, args=(filepath,), daemon=True).start()
+
     def set_environment_texture(self, filepath):
         """Set a specific environment texture for the scene"""
 
@@ -62,7 +128,7 @@ class BaseSceneManager():
         n_envtex = nodes['Environment Texture']
 
         # retrieve image object and set
-        img = blnd.load_img(filepath)
+        img = self.get_image(filepath)
         n_envtex.image = img
 
         # setup link (doesn't matter if already exists, won't duplicate)
@@ -90,7 +156,7 @@ class BaseSceneManager():
         n_objtex = nodes['Surface Image Texture']
 
         # load and assign image
-        img = blnd.load_img(filepath)
+        img = self.get_image(filepath)
         n_objtex.image = img
 
         # link to color output
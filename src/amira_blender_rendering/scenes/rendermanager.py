@@ -23,7 +23,9 @@ import bpy
 from mathutils import Vector
 
 import os
+import re
 import numpy as np
+from functools import lru_cache
 
 try:
     import ujson as json
@@ -47,6 +49,22 @@ from amira_blender_rendering.utils.io import read_numpy_image_buffer
 logger = get_logger()
 
 
+@lru_cache(maxsize=None)
+def _compile_name_pattern(names: tuple):
+    """Compile a single regex alternation matching any of the given (non empty) names.
+
+    Args:
+        names(tuple): tuple of strings to search for, e.g. parallel camera names
+
+    Returns:
+        compiled pattern, or None if no valid name is given
+    """
+    names = [n for n in names if n]
+    if not names:
+        return None
+    return re.compile('|'.join(map(re.escape, names)))
+
+
 class RenderManager(abr_scenes.BaseSceneManager):
     # NOTE: you must call setup_compositor manually when using this class!
 
@@ -56,6 +74,33 @@ class RenderManager(abr_scenes.BaseSceneManager):
         # blender settings
         super(RenderManager, self).__init__()
         self.unit_conversion = unit_conversion
+        # calibration matrices, keyed by camera name and intrinsics-relevant settings
+        self._calibration_cache = dict()
+
+    def get_calibration_matrix(self, camera):
+        """Get the (cached) calibration matrix K of a camera in the active scene.
+
+        The matrix is recomputed only if any of the settings it depends on
+        (resolution, pixel aspect, lens, sensor and shift) changed.
+
+        Args:
+            camera(bpy.types.Object): camera object
+
+        Returns:
+            np.array(3,3) camera calibration matrix
+        """
+        scene = bpy.context.scene
+        render = scene.render
+        cam = camera.data
+        key = (camera.name,
+               render.resolution_x, render.resolution_y, render.resolution_percentage,
+               render.pixel_aspect_x, render.pixel_aspect_y,
+               cam.lens, cam.sensor_width, cam.sensor_height, cam.sensor_fit, cam.shift_x, cam.shift_y)
+        K = self._calibration_cache.get(key)
+        if K is None:
+            K = np.asarray(camera_utils.get_calibration_matrix(scene, cam))
+            self._calibration_cache[key] = K
+        return K
 
     def postprocess(self, dirinfo, base_filename, camera, objs, zeroing, **kwargs):
         """Postprocessing the scene.
@@ -79,7 +124,7 @@ class RenderManager(abr_scenes.BaseSceneManager):
         postprocess_config = kwargs.get('postprocess_config', abr_scenes.BaseConfiguration().postprocess)
 
         # camera matrix
-        K_cam = np.asarray(camera_utils.get_calibration_matrix(bpy.context.scene, camera.data))
+        K_cam = self.get_calibration_matrix(camera)
 
         # first we update the view-layer to get the updated values in
         # translation and rotation
@@ -114,7 +159,8 @@ class RenderManager(abr_scenes.BaseSceneManager):
         if postprocess_config.compute_disparity:
             # check whether current camera name contains any of the given
             # string for parallel setup
-            if any([c for c in postprocess_config.parallel_cameras if c in camera.name]):
+            pattern = _compile_name_pattern(tuple(postprocess_config.parallel_cameras))
+            if pattern is not None and pattern.search(camera.name):
                 # use precomputed depth if available, otherwise use range map
                 dirpath = os.path.join(dirinfo.images.base_path, 'disparity')
                 if not os.path.exists(dirpath):
@@ -132,6 +178,8 @@ class RenderManager(abr_scenes.BaseSceneManager):
         # compute bounding boxes and save annotations
         results_gl = ResultsCollection()
         results_cv = ResultsCollection()
+        # zeroing is the same for all objects, convert it only once
+        zeroing = Vector(zeroing)
         for obj in objs:
             render_result_gl, render_result_cv = self.build_render_result(
                 obj, camera, zeroing, postprocess_config.visibility_from_mask)
@@ -145,10 +193,15 @@ class RenderManager(abr_scenes.BaseSceneManager):
             results_cv.add_result(render_result_cv)
         self.save_annotations(dirinfo, base_filename, results_gl, results_cv)
 
-    def setup_renderer(self, integrator: str, enable_denoising: bool, samples: int, motion_blur: bool):
+    def setup_renderer(self, integrator: str, enable_denoising: bool, samples: int, motion_blur: bool,
+                       persistent_data: bool = False):
         """Setup blender CUDA rendering, and specify number of samples per pixel to
         use during rendering. If the setting render_setup.samples is not set in the
         configuration, the function defaults to 128 samples per image.
+
+        With persistent_data, cycles keeps its render data (BVH, images, shaders)
+        between renders and only updates what changed, instead of re-building it
+        for each rendered view.
         """
         blnd.activate_cuda_devices()
         # TODO: this hardcodes cycles, but we want a user to specify this
@@ -167,6 +220,9 @@ class RenderManager(abr_scenes.BaseSceneManager):
         # set motion blur
         bpy.context.scene.render.use_motion_blur = motion_blur
 
+        # keep render data between renders
+        bpy.context.scene.render.use_persistent_data = persistent_data
+
         # setup denoising option
         bpy.context.scene.view_layers[0].cycles.use_denoising = enable_denoising
         self.logger.info("Denoising enabled" if enable_denoising else "Denoising disabled")
@@ -210,6 +266,7 @@ class RenderManager(abr_scenes.BaseSceneManager):
         Args:
             obj(dict): object dictionary to operate on
             camera: blender camera object
+            zeroing(Vector or array-like): camera zeroing rotation in degrees
 
         Opt Args:
             visibility_from_mask(bool): if True, if mask is found empty even if object
@@ -224,7 +281,9 @@ class RenderManager(abr_scenes.BaseSceneManager):
         # currenlty not go to the state dict. this is only here to make sure
         # that we actually get the state dict defined in pose render result
         t = np.asarray(abr_geom.get_relative_translation(obj['bpy'], camera))
-        R = np.asarray(abr_geom.get_relative_rotation_to_cam_deg(obj['bpy'], camera, Vector(zeroing)).to_matrix())
+        if not isinstance(zeroing, Vector):
+            zeroing = Vector(zeroing)
+        R = np.asarray(abr_geom.get_relative_rotation_to_cam_deg(obj['bpy'], camera, zeroing).to_matrix())
 
         # camera world coordinate transformation
         t_cam = np.asarray(camera.matrix_world.to_translation())
@@ -236,7 +295,7 @@ class RenderManager(abr_scenes.BaseSceneManager):
             # this rises a ValueError if mask info is not correct
             corners2d = self.compute_2dbbox(obj['fname_mask'])
             if corners2d is not None:
-                aabb, oobb, corners3d = self.compute_3dbbox(obj['bpy'])
+                aabb, oobb, corners3d = self.compute_3dbbox(obj['bpy'], camera)
             elif visibility_from_mask:
                 logger.warn(f'Given mask found empty. '
                             f'Overwriting visibility information for obj {obj["object_class_name"]}:{obj["object_id"]}')
@@ -361,7 +420,7 @@ class RenderManager(abr_scenes.BaseSceneManager):
 
         return result
 
-    def compute_3dbbox(self, obj: bpy.types.Object):
+    def compute_3dbbox(self, obj: bpy.types.Object, camera: bpy.types.Object = None):
         """Compute all 3D bounding boxes (axis aligned, object oriented, and the 3D corners
 
         Blender has the coordinates and bounding box in the following way.
@@ -385,6 +444,11 @@ class RenderManager(abr_scenes.BaseSceneManager):
         This will be done after getting the aabb from blender, using function
         reorder_bbox.
 
+        Args:
+            obj(bpy.types.Object): object to compute bounding boxes for
+            camera(bpy.types.Object): camera to project the 3D corners with.
+                Default: None, i.e. the active scene camera
+
         TODO: probably, using numpy is not at all required, we could directly
               store to lists. have to decide if we want this or not
         """
@@ -423,14 +487,16 @@ class RenderManager(abr_scenes.BaseSceneManager):
             np_oobb[i + 1, :] = np.array((oobb[i][0], oobb[i][1], oobb[i][2]))
 
         # project centroid+vertices and convert to pixel coordinates
+        if camera is None:
+            camera = bpy.context.scene.camera
         corners3d = []
-        prj = abr_geom.project_p3d(oo_centroid, bpy.context.scene.camera)
+        prj = abr_geom.project_p3d(oo_centroid, camera)
         pix = abr_geom.p2d_to_pixel_coords(prj)
         corners3d.append(pix)
         np_corners3d[0, :] = np.array((corners3d[-1][0], corners3d[-1][1]))
 
         for i, v in enumerate(oobb):
-            prj = abr_geom.project_p3d(v, bpy.context.scene.camera)
+            prj = abr_geom.project_p3d(v, camera)
             pix = abr_geom.p2d_to_pixel_coords(prj)
             corners3d.append(pix)
             np_corners3d[i + 1, :] = np.array((corners3d[-1][0], corners3d[-1][1]))
@@ -20,13 +20,12 @@
 import bpy
 import os
 from mathutils import Vector, Matrix
-import pathlib
-from math import ceil, log
+from math import pi
 import random
 import numpy as np
 
 from amira_blender_rendering.utils import camera as camera_utils
-from amira_blender_rendering.utils.io import expandpath
+from amira_blender_rendering.utils.io import expandpath, get_format_width
 from amira_blender_rendering.utils.logging import get_logger
 from amira_blender_rendering.dataset import get_environment_textures, build_directory_info, dump_config
 import amira_blender_rendering.utils.blender as blnd
@@ -88,7 +87,8 @@ class SimpleObject(interfaces.ABRScene):
             self.config.render_setup.integrator,
             self.config.render_setup.denoising,
             self.config.render_setup.samples,
-            self.config.render_setup.motion_blur)
+            self.config.render_setup.motion_blur,
+            self.config.render_setup.persistent_data)
 
         # setup environment texture information
         self.setup_environment_textures()
@@ -102,6 +102,11 @@ class SimpleObject(interfaces.ABRScene):
         # setup the object that we want to render
         self.setup_objects()
 
+        # random number generator used to randomize the object pose
+        # with a fixed seed, the shard id is mixed in so that parallel shards draw different poses
+        seed = self.config.dataset.seed
+        self._rng = np.random.default_rng([seed, self.config.dataset.shard_id] if seed >= 0 else None)
+
         # finally, let's setup the compositor
         self.setup_compositor()
 
@@ -234,18 +239,22 @@ class SimpleObject(interfaces.ABRScene):
     def setup_environment_textures(self):
         # get list of environment textures
         self.environment_textures = get_environment_textures(self.config.scene_setup.environment_textures)
+        # texture drawn in advance for the next scene, see randomize_environment_texture
+        self._next_environment_texture = None
+        # generator used to draw textures. With a fixed seed, the shard id is mixed in as for object poses
+        seed = self.config.dataset.seed
+        self._texture_random = random.Random(f'{seed}:{self.config.dataset.shard_id}' if seed >= 0 else None)
 
     def _rescale_object(self, scale):
         try:
-            self.obj.scale = Vector(self.config.parts[scale][self.config.scenario_setup.target_object])
-            bpy.ops.object.transform_apply(location=False, rotation=False, scale=True, properties=False)
+            blnd.apply_scale(self.obj, self.config.parts[scale][self.config.scenario_setup.target_object])
         except KeyError:
             # log and keep going
             self.logger.info(f'No scale for obj {self.obj.name} given. Skipping!')
 
     def _import_object(self):
         """Import the mesh of the cap from a ply file."""
-        bpy.ops.object.select_all(action='DESELECT')
+        blnd.deselect_all()
         class_name = expandpath(self.config.scenario_setup.target_object)
         blendfile = expandpath(self.config.parts[class_name], check_file=False)
         # try blender file
@@ -295,25 +304,37 @@ class SimpleObject(interfaces.ABRScene):
     def randomize_object_transforms(self):
         """Set an arbitrary location and rotation for the object"""
 
+        # resolve the depsgraph, object, camera and image size once, they do not change
+        # across rejection iterations
+        dg = bpy.context.evaluated_depsgraph_get()
+        obj, cam_obj = self.obj, self.cam_obj
+        width, height = self.config.camera_info.width, self.config.camera_info.height
+        test_visibility = abr_geom.test_visibility
+        rng = self._rng
         ok = False
         while not ok:
-            # random R,t
-            self.obj.location = Vector((1.0 * np.random.rand(3) - 0.5))
-            self.obj.rotation_euler = Vector((np.random.rand(3) * np.pi))
+            # random R,t. Draw all 3 + 3 values at once and pass native floats to blender
+            rnd = rng.random(6)
+            obj.location = (rnd[:3] - 0.5).tolist()
+            obj.rotation_euler = (rnd[3:] * pi).tolist()
 
             # update the scene. unfortunately it doesn't always work to just set
             # the location of the object without recomputing the dependency
             # graph
-            self._update_scene()
+            dg.update()
 
             # Test if object is still visible. That is, none of the vertices
             # should lie outside the visible pixel-space
-            ok = self._test_obj_visibility()
+            ok = test_visibility(obj, cam_obj, width, height)
 
     def randomize_environment_texture(self):
         # set some environment texture, randomize, and render
-        env_txt_filepath = expandpath(random.choice(self.environment_textures))
+        env_txt_filepath = self._next_environment_texture or self._texture_random.choice(self.environment_textures)
         self.renderman.set_environment_texture(env_txt_filepath)
+        # draw the texture of the next scene already, such that its file is read from disk while rendering
+        if self.config.render_setup.prefetch_textures:
+            self._next_environment_texture = self._texture_random.choice(self.environment_textures)
+            self.renderman.prefetch_image(self._next_environment_texture)
 
     def set_pose(self, pose):
         """
@@ -359,7 +380,7 @@ class SimpleObject(interfaces.ABRScene):
         dg.update()
 
     def dump_config(self):
-        pathlib.Path(self.dirinfo.base_path).mkdir(parents=True, exist_ok=True)
+        self._ensure_dir(self.dirinfo.base_path)
         dump_config(self.config, self.dirinfo.base_path)
 
     def generate_dataset(self):
@@ -367,12 +388,26 @@ class SimpleObject(interfaces.ABRScene):
         image_count = self.config.dataset.image_count
         if image_count <= 0:
             return False
-        format_width = int(ceil(log(image_count, 10)))
+        # filename template with the zero-padded image index, built only once
+        filename_fmt = f"s{{:0{get_format_width(image_count)}}}_v0"
+
+        # bind the configuration values used in the render loop to locals, to avoid
+        # repeated nested lookups for every image
+        shard_count = self.config.dataset.shard_count
+        shard_id = self.config.dataset.shard_id
+        zeroing = self.config.camera_info.zeroing
+        postprocess_config = self.config.postprocess
 
         i = 0
-        while i < self.config.dataset.image_count:
+        while i < image_count:
+            # when the dataset is split into shards (e.g. rendered by parallel processes) we only
+            # render the scenes belonging to the current shard. Indices (i.e., filenames) are global
+            if i % shard_count != shard_id:
+                i += 1
+                continue
+
             # generate render filename: adhere to naming convention
-            base_filename = f"s{i:0{format_width}}_v0"
+            base_filename = filename_fmt.format(i)
 
             # randomize environment and object transform
             self.randomize_environment_texture()
@@ -390,14 +425,14 @@ class SimpleObject(interfaces.ABRScene):
                 self.renderman.postprocess(
                     self.dirinfo,
                     base_filename,
-                    bpy.context.scene.camera,
+                    self.cam_obj,
                     self.objs,
-                    self.config.camera_info.zeroing,
-                    postprocess_config=self.config.postprocess)
+                    zeroing,
+                    postprocess_config=postprocess_config)
             except ValueError:
-                self.logger.warn("ValueError during post-processing, re-generating image index {i}")
+                self.logger.warn("ValueError during post-processing, re-generating image index %d", i)
             else:
-                i = i + 1
+                i += 1
 
         return True
 
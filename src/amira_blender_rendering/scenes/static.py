@@ -27,17 +27,17 @@ but to correctly write data to file.
 """
 
 import bpy
-import pathlib
 import numpy as np
 import random
-from math import ceil, log
 
 from amira_blender_rendering.utils import camera as camera_utils
-from amira_blender_rendering.utils.io import expandpath
+from amira_blender_rendering.utils.io import expandpath, get_format_width
 from amira_blender_rendering.utils.logging import get_logger
 from amira_blender_rendering.dataset import get_environment_textures, build_directory_info, dump_config
 import amira_blender_rendering.scenes as abr_scenes
 import amira_blender_rendering.math.geometry as abr_geom
+from amira_blender_rendering.math import culling
+from amira_blender_rendering.math.curves import plot_points
 import amira_blender_rendering.utils.blender as blnd
 import amira_blender_rendering.interfaces as interfaces
 from amira_blender_rendering.datastructures import Configuration
@@ -125,7 +125,8 @@ class StaticScene(interfaces.ABRScene):
             self.config.render_setup.integrator,
             self.config.render_setup.denoising,
             self.config.render_setup.samples,
-            self.config.render_setup.motion_blur)
+            self.config.render_setup.motion_blur,
+            self.config.render_setup.persistent_data)
 
         # grab environment textures
         self.setup_environment_textures()
@@ -142,6 +143,14 @@ class StaticScene(interfaces.ABRScene):
         # populate the scene with objects (target and non)
         self.objs = self.setup_objects(self.config.scenario_setup.target_objects)
 
+        # blender handles of target objects, parallel to self.objs, for tight per-object loops
+        self.objs_bpy = [obj['bpy'] for obj in self.objs]
+        # number of failed visibility tests per target object, see test_visibility
+        self._visibility_fail_counts = np.zeros(len(self.objs), dtype=np.int64)
+        # compile (or load from cache) the numeric kernels used in visibility tests now,
+        # rather than stalling the first scene
+        culling.warmup()
+
         # finally, setup the compositor
         self.setup_compositor()
 
@@ -261,6 +270,10 @@ class StaticScene(interfaces.ABRScene):
         be selected elsewhere.
         """
         scene = bpy.context.scene
+        # keep references to the camera objects, such that they are not looked up by name for every view
+        self.camera_objs = dict()
+        # bpy camera names, aligned with scene_setup.cameras
+        self.camera_names = list()
         for cam in self.config.scene_setup.cameras:
             # first get the camera name. This depends on the scene (blend file)
             cam_name = self.get_camera_name(cam)
@@ -268,7 +281,9 @@ class StaticScene(interfaces.ABRScene):
             # make sure that this happens here, we select it
             blnd.select_object(cam_name)
             # modify camera according to the intrinsics
-            blender_camera = bpy.data.objects[cam_name].data
+            self.camera_objs[cam_name] = bpy.data.objects[cam_name]
+            self.camera_names.append(cam_name)
+            blender_camera = self.camera_objs[cam_name].data
             # set the calibration matrix
             camera_utils.set_camera_info(scene, blender_camera, self.config.camera_info)
 
@@ -293,6 +308,7 @@ class StaticScene(interfaces.ABRScene):
         # let's start with an empty list
         objs = []
         obk = ObjectBookkeeper()
+        bpy_objects = bpy.data.objects
 
         # extract all objects from the configuration. An object has a certain
         # type, as well as an own id. this information is storeed in the objs
@@ -314,14 +330,13 @@ class StaticScene(interfaces.ABRScene):
 
             # go over the object instances
             for j in range(int(obj_count)):
-                # First, deselect everything
-                bpy.ops.object.select_all(action='DESELECT')
-
                 # retrieve object name. We assume object instances follow the standard convention
                 # class_name.xxx where xxx is an increasing number starting at 000.
+                # Objects are looked up by name directly, w/o (de)selecting all objects in the scene
                 bpy_obj_name = f'{class_name}.{j:03d}'
-                blnd.select_object(bpy_obj_name)
-                new_obj = bpy.context.object
+                new_obj = bpy_objects.get(bpy_obj_name)
+                if new_obj is None:
+                    self.logger.warn(f"Could not find object {bpy_obj_name}")
                                     
                 # bookkeep instance
                 obk.add(class_name)
@@ -338,9 +353,11 @@ class StaticScene(interfaces.ABRScene):
 
         # build masks id for compositor of the format _N_M, where N is the model
         # id, and M is the object id
-        w_class = ceil(log(len(obk), 10)) if len(obk) else 0  # format width for number of model types
+        w_class = get_format_width(len(obk))  # format width for number of model types
+        # format width for same model, computed once per class
+        w_obj_by_class = {name: get_format_width(spec['instances']) for name, spec in obk.items()}
         for i, obj in enumerate(objs):
-            w_obj = ceil(log(obk[obj['object_class_name']]['instances'], 10))  # format width for objs with same model
+            w_obj = w_obj_by_class[obj['object_class_name']]
             id_mask = f"_{obj['object_class_id']:0{w_class}}_{obj['object_id']:0{w_obj}}"
             obj['id_mask'] = id_mask
         
@@ -352,6 +369,11 @@ class StaticScene(interfaces.ABRScene):
     def setup_environment_textures(self):
         # get list of environment textures
         self.environment_textures = get_environment_textures(self.config.scene_setup.environment_textures)
+        # texture drawn in advance for the next scene, see randomize_environment_texture
+        self._next_environment_texture = None
+        # generator used to draw textures. With a fixed seed, the shard id is mixed in as for object poses
+        seed = self.config.dataset.seed
+        self._texture_random = random.Random(f'{seed}:{self.config.dataset.shard_id}' if seed >= 0 else None)
 
     def setup_textured_objects(self):
         # get list of textures
@@ -364,17 +386,21 @@ class StaticScene(interfaces.ABRScene):
 
     def randomize_environment_texture(self):
         # set some environment texture, randomize, and render
-        env_txt_filepath = expandpath(random.choice(self.environment_textures))
+        env_txt_filepath = self._next_environment_texture or self._texture_random.choice(self.environment_textures)
         self.renderman.set_environment_texture(env_txt_filepath)
+        # draw the texture of the next scene already, such that its file is read from disk while rendering
+        if self.config.render_setup.prefetch_textures:
+            self._next_environment_texture = self._texture_random.choice(self.environment_textures)
+            self.renderman.prefetch_image(self._next_environment_texture)
 
     def randomize_textured_objects_textures(self):
         for obj_name in self.config.scenario_setup.textured_objects:
-            obj_txt_filepath = expandpath(random.choice(self.objects_textures))
+            obj_txt_filepath = self._texture_random.choice(self.objects_textures)
             self.renderman.set_object_texture(obj_name, obj_txt_filepath)
 
     def activate_camera(self, cam_name: str):
         # first get the camera name. this depends on the scene (blend file)
-        bpy.context.scene.camera = bpy.context.scene.objects[f"{cam_name}"]
+        bpy.context.scene.camera = self.camera_objs[cam_name]
 
     def set_camera_location(self, name, location):
         """
@@ -384,50 +410,79 @@ class StaticScene(interfaces.ABRScene):
             name(str): camera name
             location(array-like): camera location
         """
-        # select camera
-        blnd.select_object(name)
-        # set pose
-        bpy.data.objects[name].location = location
+        self.camera_objs[name].location = location
 
     def get_camera_name(self, cam_str):
         """Get bpy camera name from camera string in config. This depends on the loaded blend file"""
         return f"{cam_str}"
 
-    def test_visibility(self, camera_name: str, locations: np.array):
+    def test_visibility(self, camera_name: str, locations: np.array, early_exit: bool = False):
         """Test whether given camera sees all target objects
         and store visibility level/label for each target object
         
         Args:
             camera(str): selected camera name
             locations(list): list of locations to check. If None, check current camera location
+            early_exit(bool): if True, return as soon as one object is not visible, testing the
+                objects that failed most often so far first. Object visibility info is then incomplete,
+                hence use it only to reject scenes. Default: False
         """
 
-        # grep camera object from name
-        camera = bpy.context.scene.objects[camera_name]
-
-        # make sure to work with multi-dim array
-        if locations.shape == (3,):
-            locations = np.reshape(locations, (1, 3))
+        # grep scene, view layer, depsgraph, render resolution and camera object once for all locations
+        scene = bpy.context.scene
+        view_layer = scene.view_layers['View Layer']
+        depsgraph = view_layer.depsgraph
+        res_x, res_y = scene.render.resolution_x, scene.render.resolution_y
+        camera = self.camera_objs[camera_name]
+
+        # make sure to work with a (N, 3) array, also for a single location or array-like input.
+        # For arrays this is a view, no data is copied
+        locations = np.reshape(locations, (-1, 3))
+
+        # conservative bounding spheres of target objects. These do not move while testing camera locations
+        centers, radii = abr_geom.get_bounding_spheres(self.objs_bpy)
+        # for the same reason, world coordinates of their vertices are only computed once (when first needed)
+        vertices = [None] * len(self.objs)
         
-        # loop over locations
-        for i_loc, location in enumerate(locations):
+        # loop over locations, converted to native floats once rather than read element-wise from numpy rows
+        for i_loc, location in enumerate(locations.tolist()):
             camera.location = location
+            view_layer.update()
+
+            # cheap frustum culling: objects whose bounding sphere lies outside the
+            # camera frustum are certainly not visible and skip the expensive occlusion test
+            planes = abr_geom.get_camera_frustum_planes(camera, scene)
+            in_frustum = [True] * len(self.objs) if planes is None else \
+                abr_geom.test_spheres_in_frustum(planes, centers, radii)
+
+            # when exiting early, test first the objects which are most likely to fail
+            order = np.argsort(-self._visibility_fail_counts, kind='stable') if early_exit else range(len(self.objs))
 
             any_not_visible_or_occluded = False
-            for obj in self.objs:
-                not_visible_or_occluded = abr_geom.test_occlusion(
-                    bpy.context.scene,
-                    bpy.context.scene.view_layers['View Layer'],
+            for i_obj in order:
+                obj, bpy_obj = self.objs[i_obj], self.objs_bpy[i_obj]
+                if in_frustum[i_obj] and vertices[i_obj] is None:
+                    vertices[i_obj] = abr_geom.get_world_vertices(bpy_obj, depsgraph)
+                not_visible_or_occluded = not in_frustum[i_obj] or abr_geom.test_occlusion(
+                    scene,
+                    view_layer,
                     camera,
-                    obj['bpy'],
-                    bpy.context.scene.render.resolution_x,
-                    bpy.context.scene.render.resolution_y,
+                    bpy_obj,
+                    res_x,
+                    res_y,
                     require_all=False,
-                    origin_offset=0.01)
+                    origin_offset=0.01,
+                    update_depsgraph=False,
+                    depsgraph=depsgraph,
+                    vertices=vertices[i_obj])
+                if not_visible_or_occluded:
+                    self._visibility_fail_counts[i_obj] += 1
+                    if early_exit:
+                        # the scene gets rejected anyway, skip labelling and (costly) logging of the object
+                        return False
+                    self.logger.warn("object %s not visible or occluded", obj)
                 # store object visibility info
                 obj['visible'] = not not_visible_or_occluded
-                if not_visible_or_occluded:
-                    self.logger.warn(f"object {obj} not visible or occluded")
             
                 # keep trace if any obj was not visible or occluded
                 any_not_visible_or_occluded = any_not_visible_or_occluded or not_visible_or_occluded
@@ -460,13 +515,11 @@ class StaticScene(interfaces.ABRScene):
         # filename setup
         if self.config.dataset.image_count <= 0:
             return False
-        scn_format_width = int(ceil(log(self.config.dataset.scene_count, 10)))
+        scn_format_width = get_format_width(self.config.dataset.scene_count)
         
-        camera_names = [self.get_camera_name(cam_str) for cam_str in self.config.scene_setup.cameras]
+        camera_names = self.camera_names
         if self.render_mode == 'default':
             cameras_locations = camera_utils.get_current_cameras_locations(camera_names)
-            for cam_name, cam_location in cameras_locations.items():
-                cameras_locations[cam_name] = np.reshape(cam_location, (1, 3))
         
         elif self.render_mode == 'multiview':
             cameras_locations, _ = camera_utils.generate_multiview_cameras_locations(
@@ -478,6 +531,13 @@ class StaticScene(interfaces.ABRScene):
 
         else:
             raise ValueError(f'Selected render mode {self.render_mode} not currently supported')
+
+        # camera locations do not change across scenes, hence build the filename templates only once.
+        # Per-camera lists are aligned with camera_names and self.dirinfos. Locations are
+        # normalized once to (N, 3) arrays, also for the single location of default mode
+        cameras_locations_list = [np.reshape(cameras_locations[cam_name], (-1, 3)) for cam_name in camera_names]
+        filename_fmts = [f"s{{:0{scn_format_width}}}_v{{:0{get_format_width(len(cam_locations))}}}"
+                         for cam_locations in cameras_locations_list]
        
         # some debug options
         # NOTE: at this point the object of interest have been loaded in the blender
@@ -486,28 +546,43 @@ class StaticScene(interfaces.ABRScene):
         if self.config.debug.enabled:
             # simple plot of generated camera locations
             if self.config.debug.plot:
-                from amira_blender_rendering.math.curves import plot_points
-
-                for cam_name in camera_names:
-                    plot_points(np.array(cameras_locations[cam_name]),
-                                bpy.context.scene.objects[cam_name],
+                for cam_name, cam_locations in zip(camera_names, cameras_locations_list):
+                    plot_points(cam_locations,
+                                self.camera_objs[cam_name],
                                 plot_axis=self.config.debug.plot_axis,
                                 scatter=self.config.debug.scatter)
 
             # save all generated camera locations to .blend for later debug
             if self.config.debug.save_to_blend:
-                for i_cam, cam_name in enumerate(camera_names):
+                for dirinfo, cam_name, cam_locations in zip(self.dirinfos, camera_names, cameras_locations_list):
                     self.save_to_blend(
-                        self.dirinfos[i_cam],
+                        dirinfo,
                         camera_name=cam_name,
-                        camera_locations=cameras_locations[cam_name],
+                        camera_locations=cam_locations,
                         basefilename='robottable_camera_locations')
 
+        # bind the configuration values used in the render loop to locals, to avoid
+        # repeated nested lookups for every scene and view
+        scene_count = self.config.dataset.scene_count
+        view_count = self.config.dataset.view_count
+        shard_count = self.config.dataset.shard_count
+        shard_id = self.config.dataset.shard_id
+        allow_occlusions = self.config.render_setup.allow_occlusions
+        debug_save_to_blend = self.config.debug.enabled and self.config.debug.save_to_blend
+        zeroing = self.config.camera_info.zeroing
+        postprocess_config = self.config.postprocess
+
         # control loop for the number of static scenes to render
         scn_counter = 0
         retry = 0
         MAX_RETRY = 5
-        while scn_counter < self.config.dataset.scene_count:
+        while scn_counter < scene_count:
+
+            # when the dataset is split into shards (e.g. rendered by parallel processes) we only
+            # render the scenes belonging to the current shard. Indices (i.e., filenames) are global
+            if scn_counter % shard_count != shard_id:
+                scn_counter += 1
+                continue
 
             # randomize scene: move objects at random locations, and forward simulate physics
             self.randomize_environment_texture()
@@ -515,9 +590,11 @@ class StaticScene(interfaces.ABRScene):
             
             # check visibility
             repeat_frame = False
-            if not self.config.render_setup.allow_occlusions:
-                for cam_name, cam_locations in cameras_locations.items():
-                    repeat_frame = not self.test_visibility(cam_name, cam_locations)
+            if not allow_occlusions:
+                for cam_name, cam_locations in zip(camera_names, cameras_locations_list):
+                    if not self.test_visibility(cam_name, cam_locations, early_exit=True):
+                        repeat_frame = True
+                        break
 
             # if we need to repeat (change static scene) we skip one iteration
             # without increasing the counter
@@ -526,106 +603,108 @@ class StaticScene(interfaces.ABRScene):
                                   ' Make sure your static scene and config are correct. Exiting!')
                 exit(-1)
 
-            # loop over cameras
-            for i_cam, cam_str in enumerate(self.config.scene_setup.cameras):
-                # get bpy object camera name
-                cam_name = self.get_camera_name(cam_str)
-
-                # check whether we broke the for-loop responsible for image generation for
-                # multiple camera views and repeat the frame by re-generating the static scene
-                if repeat_frame:
-                    # retry at most 'max_retry' times then exit
-                    if retry < MAX_RETRY:
-                        break
-                    self.logger.error(f'Max num of {MAX_RETRY} retry reached. Check your static scene is correct. Exit')
-                    exit(-1)
-        
-                # extract camera locations
-                cam_locations = cameras_locations[cam_name]
-                
-                # compute format width
-                view_format_width = int(ceil(log(len(cam_locations), 10)))
-                
-                # activate camera
-                self.activate_camera(cam_name)
-
-                # loop over locations
-                for view_counter, cam_loc in enumerate(cam_locations):
-
-                    self.logger.info(f"Generating image for camera {cam_str}: "
-                                     f"scene {scn_counter + 1}/{self.config.dataset.scene_count}, "
-                                     f"view {view_counter + 1}/{self.config.dataset.view_count}")
-
-                    # filename
-                    base_filename = f"s{scn_counter:0{scn_format_width}}_v{view_counter:0{view_format_width}}"
-
-                    # set camera location
-                    self.set_camera_location(cam_name, cam_loc)
-
-                    # at this point all the locations have already been tested for visibility
-                    # according to allow_occlusions config.
-                    # Here, we re-run visibility to set object visibility level as well as to update
-                    # the depsgraph needed to update translation and rotation info
-                    all_visible = self.test_visibility(cam_name, cam_loc)
-
-                    if not all_visible:
-                        # if debug is enabled save to blender for debugging
-                        if self.config.debug.enabled and self.config.debug.save_to_blend:
-                            self.save_to_blend(
-                                self.dirinfos[i_cam],
-                                scene_index=scn_counter,
-                                view_index=view_counter,
-                                basefilename='robottable_visibility')
-
-                    # update path information in compositor
-                    self.renderman.setup_pathspec(self.dirinfos[i_cam], base_filename, self.objs)
+            # loop over cameras. If a view fails, RepeatFrame aborts all cameras and views
+            # and the static scene is re-generated
+            cameras_iter = zip(self.config.scene_setup.cameras, camera_names, self.dirinfos,
+                               cameras_locations_list, filename_fmts)
+            try:
+                for cam_str, cam_name, dirinfo, cam_locations, filename_fmt in cameras_iter:
+                    # activate camera, and keep a reference to it for post-processing
+                    self.activate_camera(cam_name)
+                    camera = self.camera_objs[cam_name]
+
+                    # loop over locations
+                    for view_counter, cam_loc in enumerate(cam_locations):
+
+                        self.logger.info("Generating image for camera %s: scene %d/%d, view %d/%d",
+                                         cam_str, scn_counter + 1, scene_count,
+                                         view_counter + 1, view_count)
+
+                        # filename
+                        base_filename = filename_fmt.format(scn_counter, view_counter)
+
+                        # set camera location
+                        self.set_camera_location(cam_name, cam_loc)
+
+                        # at this point all the locations have already been tested for visibility
+                        # according to allow_occlusions config.
+                        if allow_occlusions:
+                            # Here, we re-run visibility to set object visibility level as well as to update
+                            # the depsgraph needed to update translation and rotation info
+                            all_visible = self.test_visibility(cam_name, cam_loc)
+                        else:
+                            # all objects passed the visibility test for all locations, hence there is no
+                            # need to ray cast again. Only update the depsgraph for the new camera location
+                            for obj in self.objs:
+                                obj['visible'] = True
+                            bpy.context.view_layer.update()
+                            all_visible = True
+
+                        if not all_visible:
+                            # if debug is enabled save to blender for debugging
+                            if debug_save_to_blend:
+                                self.save_to_blend(
+                                    dirinfo,
+                                    scene_index=scn_counter,
+                                    view_index=view_counter,
+                                    basefilename='robottable_visibility')
+
+                        # update path information in compositor
+                        self.renderman.setup_pathspec(dirinfo, base_filename, self.objs)
                     
-                    # finally, render
-                    self.renderman.render()
-
-                    # postprocess. this will take care of creating additional
-                    # information, as well as fix filenames
-                    try:
-                        self.renderman.postprocess(
-                            self.dirinfos[i_cam],
-                            base_filename,
-                            bpy.context.scene.camera,
-                            self.objs,
-                            self.config.camera_info.zeroing,
-                            postprocess_config=self.config.postprocess)
+                        # finally, render
+                        self.renderman.render()
+
+                        # postprocess. this will take care of creating additional
+                        # information, as well as fix filenames
+                        try:
+                            self.renderman.postprocess(
+                                dirinfo,
+                                base_filename,
+                                camera,
+                                self.objs,
+                                zeroing,
+                                postprocess_config=postprocess_config)
                         
-                        if self.config.debug.enabled and self.config.debug.save_to_blend:
-                            # reset frame to 0 and save
-                            bpy.context.scene.frame_set(0)
-                            self.save_to_blend(
-                                self.dirinfos[i_cam],
-                                scene_index=scn_counter,
-                                view_index=view_counter,
-                                basefilename='robottable')
-
-                    except ValueError:
-                        self.logger.error(
-                            f"\033[1;31mValueError during post-processing. "
-                            f"Re-generating image {scn_counter + 1}/{self.config.dataset.scene_count}\033[0;37m")
-                        repeat_frame = True
-                        retry += 1
-
-                        # if requested save to blend files for debugging
-                        if self.config.debug.enabled and self.config.debug.save_to_blend:
-                            self.logger.error('There might be a discrepancy between generated mask and '
-                                              'object visibility data. Saving debug info to .blend')
-                            self.save_to_blend(
-                                self.dirinfos[i_cam],
-                                scene_index=scn_counter,
-                                view_index=view_counter,
-                                on_error=True,
-                                basefilename='robottable')
-
-                        break
+                            if debug_save_to_blend:
+                                # save with the frame reset to 0. Only the frame number is changed (and restored),
+                                # frame_set would re-evaluate the scene twice and reset the simulation for further views
+                                scene = bpy.context.scene
+                                current_frame = scene.frame_current
+                                scene.frame_current = 0
+                                self.save_to_blend(
+                                    dirinfo,
+                                    scene_index=scn_counter,
+                                    view_index=view_counter,
+                                    basefilename='robottable')
+                                scene.frame_current = current_frame
+
+                        except ValueError:
+                            self.logger.error(
+                                "\033[1;31mValueError during post-processing. Re-generating image %d/%d\033[0;37m",
+                                scn_counter + 1, scene_count)
+                            retry += 1
+
+                            # if requested save to blend files for debugging
+                            if debug_save_to_blend:
+                                self.logger.error('There might be a discrepancy between generated mask and '
+                                                  'object visibility data. Saving debug info to .blend')
+                                self.save_to_blend(
+                                    dirinfo,
+                                    scene_index=scn_counter,
+                                    view_index=view_counter,
+                                    on_error=True,
+                                    basefilename='robottable')
+
+                            raise interfaces.RepeatFrame()
+            except interfaces.RepeatFrame:
+                # retry at most 'max_retry' times then exit
+                if retry >= MAX_RETRY:
+                    self.logger.error(f'Max num of {MAX_RETRY} retry reached. Check your static scene is correct. Exit')
+                    exit(-1)
+                continue
 
-            # update scene counter
-            if not repeat_frame:
-                scn_counter = scn_counter + 1
+            scn_counter += 1
 
         return True
 
@@ -635,7 +714,7 @@ class StaticScene(interfaces.ABRScene):
         # camera that was rendered we store the configuration
         for dirinfo in self.dirinfos:
             output_path = dirinfo.base_path
-            pathlib.Path(output_path).mkdir(parents=True, exist_ok=True)
+            self._ensure_dir(output_path)
             dump_config(self.config, output_path)
 
     def teardown(self):
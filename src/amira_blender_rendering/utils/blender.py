@@ -17,7 +17,7 @@
 # limitations under the License.
 
 import bpy
-from mathutils import Vector
+from mathutils import Matrix, Vector
 
 from amira_blender_rendering.utils.logging import get_logger
 
@@ -131,6 +131,17 @@ def clear_orphaned_materials():
         bpy.data.materials.remove(mat)
 
 
+def deselect_all():
+    """Deselect all objects in the active view layer.
+
+    Differently from bpy.ops.object.select_all(action='DESELECT'), this only
+    visits the currently selected objects and does not trigger operator
+    overhead (context checks, undo pushes).
+    """
+    for obj in bpy.context.selected_objects:
+        obj.select_set(False)
+
+
 def select_object(obj_name: str):
     """Select and activate an object given its name"""
     if obj_name not in bpy.data.objects:
@@ -138,12 +149,78 @@ def select_object(obj_name: str):
         return
 
     # we first deselect all, then select and activate the target object
-    bpy.ops.object.select_all(action='DESELECT')
+    deselect_all()
     obj = bpy.data.objects[obj_name]
     obj.select_set(True)
     bpy.context.view_layer.objects.active = obj
 
 
+def get_or_create_collection(name: str) -> bpy.types.Collection:
+    """Get a collection by name. If it does not exist, create it and link it to the active scene.
+
+    Args:
+        name (str): name of the collection
+
+    Returns:
+        The collection
+    """
+    collection = bpy.data.collections.get(name)
+    if collection is None:
+        collection = bpy.data.collections.new(name)
+        bpy.context.scene.collection.children.link(collection)
+    return collection
+
+
+def duplicate_object(obj: bpy.types.Object, name: str = None, copy_data: bool = True) -> bpy.types.Object:
+    """Duplicate an object using the data API, i.e. without operators.
+
+    Differently from bpy.ops.object.duplicate, this does not depend on the
+    current selection and does not trigger operator overhead (context checks,
+    undo pushes). As the operator, the duplicate is linked to all collections
+    the original object belongs to (e.g. also to the rigid body world collection).
+
+    Args:
+        obj (bpy.types.Object): object to duplicate
+        name (str): optional name for the duplicate
+        copy_data (bool): if True, also copy the object data (e.g. mesh),
+            otherwise the data is shared among original and duplicate.
+
+    Returns:
+        The duplicated object
+    """
+    new_obj = obj.copy()
+    if copy_data and obj.data is not None:
+        new_obj.data = obj.data.copy()
+    if name is not None:
+        new_obj.name = name
+    for collection in obj.users_collection:
+        collection.objects.link(new_obj)
+    return new_obj
+
+
+def apply_scale(obj: bpy.types.Object, scale):
+    """Scale an object and apply the scale to its data.
+
+    This has the same effect as setting obj.scale and running
+    bpy.ops.object.transform_apply(scale=True) on the object, but for
+    single-user meshes the vertices are transformed directly, without operator
+    overhead (selection, context checks, undo pushes). Other objects, e.g.
+    empties or objects with children, fall back to the operator.
+
+    Args:
+        obj (bpy.types.Object): object to scale
+        scale (array-like): scale along x, y, and z
+    """
+    if isinstance(obj.data, bpy.types.Mesh) and obj.data.users == 1 and not obj.children:
+        obj.data.transform(Matrix.Diagonal(Vector(scale)).to_4x4())
+        obj.data.update()
+        obj.scale = (1.0, 1.0, 1.0)
+    else:
+        obj.scale = Vector(scale)
+        select_object(obj.name)
+        bpy.ops.object.transform_apply(location=False, rotation=False, scale=True, properties=False)
+
+
 def add_default_material(obj: bpy.types.Object = bpy.context.object,
                          name: str = 'DefaultMaterial') -> bpy.types.Material:
 
@@ -325,6 +325,40 @@ def get_intrinsics(scene, cam):
     return s_u, s_v, u_0, v_0
 
 
+# inverse norms of the pixel rays only depend on the camera intrinsics and resolution,
+# which are fixed for a camera throughout a dataset. Cache them across rendered views
+_RAY_NORMS_CACHE_SIZE = 8
+_ray_norms_cache = dict()
+
+
+def _get_inverse_ray_norms(calibration_matrix: np.array, res_x: int, res_y: int):
+    """Compute (or get from cache) the inverse norm of the viewing ray through each pixel.
+
+    Args:
+        calibration_matrix(np.array): 3x3 camera calibration matrix
+        res_x(int): render/image x resolution (pixel)
+        res_y(int): render/image y resolution (pixel)
+
+    Returns:
+        np.array: (res_x, res_y) array of inverse ray norms (transposed, since depth is in WxH)
+    """
+    K = np.asarray(calibration_matrix, dtype=np.float64)
+    key = (K.tobytes(), res_x, res_y)
+    inv_norms = _ray_norms_cache.get(key)
+    if inv_norms is None:
+        # rays K^-1 [u, v, 1]^T, computed by broadcasting over the pixel grid
+        K_inv = np.linalg.inv(K)
+        u = np.arange(res_x, dtype=np.float64)
+        v = np.arange(res_y, dtype=np.float64)
+        v_dirs_mtx = K_inv[:, 0] * u.reshape(1, res_x, 1) + K_inv[:, 1] * v.reshape(res_y, 1, 1) + K_inv[:, 2]
+        # transpose since depth is in WxH
+        inv_norms = np.reciprocal(np.linalg.norm(v_dirs_mtx, axis=2)).transpose()
+        if len(_ray_norms_cache) >= _RAY_NORMS_CACHE_SIZE:
+            _ray_norms_cache.clear()
+        _ray_norms_cache[key] = inv_norms
+    return inv_norms
+
+
 def project_pinhole_range_to_rectified_depth(filepath_in: str, filepath_out: str,
                                              calibration_matrix: np.array,
                                              res_x: int = bpy.context.scene.render.resolution_x,
@@ -366,16 +400,7 @@ def project_pinhole_range_to_rectified_depth(filepath_in: str, filepath_out: str
 
     # perform transformation
     logger.info('Rectifying pinhole range map into depth')
-    grid = np.indices((res_y, res_x))
-    u = grid[1].flatten()
-    v = grid[0].flatten()
-    uv1 = np.array([u, v, np.ones(res_x * res_y)])
-
-    K_inv = np.linalg.inv(calibration_matrix)
-    v_dirs_mtx = np.dot(K_inv, uv1).T.reshape(res_y, res_x, 3)
-    v_dirs_mtx_unit_inv = np.reciprocal(np.linalg.norm(v_dirs_mtx, axis=2))
-    # transpose since depth is in WxH
-    v_dirs_mtx_unit_inv = v_dirs_mtx_unit_inv.transpose()
+    v_dirs_mtx_unit_inv = _get_inverse_ray_norms(calibration_matrix, res_x, res_y)
 
     depth_img = (range_exr * v_dirs_mtx_unit_inv * scale)
     # remove overflow values
@@ -52,6 +52,21 @@ def get_my_dir(my_path):
     return fullpath
 
 
+def get_format_width(count: int) -> int:
+    """Number of digits required to format all indices 0, ..., count - 1
+
+    This replaces the floating point ceil(log(count, 10)), which is also
+    subject to rounding errors for powers of 10.
+
+    Args:
+        count(int): number of elements to index
+
+    Returns:
+        format width, i.e., number of decimal digits of the largest index (0 for count <= 1)
+    """
+    return len(str(count - 1)) if count > 1 else 0
+
+
 def __try_func(func, *args, **kwargs):
     def wrapper(*args, **kwargs):
         try:
@@ -115,7 +130,12 @@ def write_numpy_image_buffer(buf, filepath_out):
         # convert ('blow-up') back to RGBA pixels, required for blender's Image struct, and set Alpha to 1.0
         buf_rgba = np.repeat(buf[:, :, np.newaxis], 4, axis=2)
         buf_rgba[:, :, 3] = 1.0
-        output.pixels = buf_rgba.ravel()
+        # foreach_set copies the whole (float32) buffer at once instead of assigning pixel by pixel.
+        # Image pixels only provide it since blender 2.83
+        if hasattr(output.pixels, 'foreach_set'):
+            output.pixels.foreach_set(buf_rgba.astype(np.float32).ravel())
+        else:
+            output.pixels = buf_rgba.ravel()
         # use save_render, because this way we get the image_settings applied to the PNG file. Unfortunately, there
         # doesn't seem to be another way to set the color mode and depth for a PNG that gets written to
         # a file.
@@ -170,7 +190,13 @@ def read_numpy_image_buffer(filepath_in, check_exr_format=False):
     # extract the first channel of the PNG image
     width = img_data.size[0]
     height = img_data.size[1]
-    buf = np.array(img_data.pixels[:], dtype=np.float32)
+    # foreach_get copies all pixels at once into the buffer, slicing pixels[:] would create a python float per value.
+    # Image pixels only provide it since blender 2.83
+    if hasattr(img_data.pixels, 'foreach_get'):
+        buf = np.empty(width * height * img_data.channels, dtype=np.float32)
+        img_data.pixels.foreach_get(buf)
+    else:
+        buf = np.array(img_data.pixels[:], dtype=np.float32)
     buf = buf.reshape(width, height, img_data.channels)
     buf = buf[:, :, 0]
 
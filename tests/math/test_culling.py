@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 - for information on the respective copyright owner
+# see the NOTICE file and/or the repository
+# <https://github.com/boschresearch/amira-blender-rendering>.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import unittest
+import numpy as np
+import numpy.testing as npt
+from amira_blender_rendering.math import culling
+import tests
+
+
+@tests.register(name='test_math')
+class TestCulling(unittest.TestCase):
+
+    def setUp(self):
+        # unit cube as "frustum", with inward pointing normals
+        self.planes = np.array([[1, 0, 0, 1], [-1, 0, 0, 1], [0, 1, 0, 1],
+                                [0, -1, 0, 1], [0, 0, 1, 1], [0, 0, -1, 1]], dtype=np.float64)
+        self.centers = np.array([[0, 0, 0], [1.5, 0, 0], [3, 0, 0]], dtype=np.float64)
+        self.radii = np.array([0.1, 1, 1], dtype=np.float64)
+
+    def test_frustum_sphere_cull(self):
+        mask = np.array([True, True, False])
+        npt.assert_equal(mask, culling.frustum_sphere_cull(self.planes, self.centers, self.radii))
+        # loop (jit) and numpy implementations must agree
+        npt.assert_equal(mask, culling._frustum_sphere_cull_loop(self.planes, self.centers, self.radii))
+        npt.assert_equal(mask, culling._frustum_sphere_cull_numpy(self.planes, self.centers, self.radii))
+
+    def test_points_in_image(self):
+        # identity projection: points map to pixels (x + 1, 1 - y) for scale (1, -1)
+        mvp = np.eye(4)
+        points = np.array([[0, 0, 0], [0.5, -0.5, 0], [1.5, 0, 0], [0, 1.5, 0]], dtype=np.float64)
+        mask = np.array([True, True, False, False])
+        for fun in [culling.points_in_image, culling._points_in_image_loop, culling._points_in_image_numpy]:
+            vis, valid = fun(mvp, points, 1.0, -1.0, 2.0, 2.0)
+            self.assertTrue(valid)
+            npt.assert_equal(mask, vis)
+        # points with w == 0 cannot be projected
+        mvp[3, 3] = 0
+        self.assertFalse(culling.points_in_image(mvp, points, 1.0, -1.0, 2, 2)[1])
+
+    def test_warmup(self):
+        # must work with and without numba
+        culling.warmup()
+        npt.assert_equal(np.array([True, True, False]),
+                         culling.frustum_sphere_cull(self.planes, self.centers, self.radii))
+
+    def tearDown(self):
+        pass
+
+
+def main():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestCulling))
+    runner = unittest.TextTestRunner()
+    runner.run(suite)
+
+
+if __name__ == '__main__':
+    main()
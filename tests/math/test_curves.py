@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 - for information on the respective copyright owner
+# see the NOTICE file and/or the repository
+# <https://github.com/boschresearch/amira-blender-rendering>.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import unittest
+import numpy as np
+import numpy.testing as npt
+from amira_blender_rendering.math import curves
+import tests
+
+
+@tests.register(name='test_math')
+class TestCurves(unittest.TestCase):
+
+    def test_generate_points_on_sphere(self):
+        points = curves.generate_points_on_sphere(20)
+        self.assertEqual(points.shape, (20, 3))
+        npt.assert_almost_equal(np.linalg.norm(points, axis=1), np.ones(20))
+
+    def test_points_on_viewsphere(self):
+        for n in [1, 2, 30]:
+            points = curves.points_on_viewsphere(n, scale=2, bias=(0, 0, 1.5))
+            self.assertEqual(points.shape, (n, 3))
+            # upper half sphere only
+            self.assertTrue(np.all(points[:, 2] >= 1.5))
+
+    def test_points_on_piecewise_line(self):
+        control_points = [np.zeros(3), np.array([1., 0, 0]), np.array([1., 1, 0])]
+        points = curves.points_on_piecewise_line(5, control_points)
+        self.assertEqual(points.shape, (5, 3))
+        npt.assert_almost_equal(points[0], control_points[0])
+        npt.assert_almost_equal(points[2], control_points[1])
+        npt.assert_almost_equal(points[-1], control_points[-1])
+
+    def test_points_on_piecewise_line_non_unit_segments(self):
+        control_points = [np.zeros(3), np.array([2., 0, 0]), np.array([2., 3, 0])]
+        points = curves.points_on_piecewise_line(6, control_points)
+        # total length 5, hence points are spaced by 1 along the line
+        npt.assert_almost_equal(points[1], [1, 0, 0])
+        npt.assert_almost_equal(points[2], control_points[1])
+        npt.assert_almost_equal(points[3], [2, 1, 0])
+        npt.assert_almost_equal(points[-1], control_points[-1])
+
+    def tearDown(self):
+        pass
+
+
+def main():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestCurves))
+    runner = unittest.TextTestRunner()
+    runner.run(suite)
+
+
+if __name__ == '__main__':
+    main()
@@ -87,6 +87,27 @@ class TestGeometry(unittest.TestCase):
         self.assertTrue(geometry.test_occlusion(scene, layer, self._cam, self._obj_non_visible, self._w, self._h),
                         'Non visible object appears visible')
 
+    def test_test_spheres_in_frustum(self):
+        # unit cube as "frustum", with inward pointing normals
+        planes = np.array([[1, 0, 0, 1], [-1, 0, 0, 1], [0, 1, 0, 1], [0, -1, 0, 1], [0, 0, 1, 1], [0, 0, -1, 1]])
+        centers = np.array([[0, 0, 0], [1.5, 0, 0], [3, 0, 0]])
+        radii = np.array([0.1, 1, 1])
+        npt.assert_equal(np.array([True, True, False]), geometry.test_spheres_in_frustum(planes, centers, radii))
+
+    def test_get_world_aabbs(self):
+        objs = [self._obj1, self._obj2]
+        aabbs = geometry.get_world_aabbs(objs)
+        for obj, aabb in zip(objs, aabbs):
+            corners = np.asarray([obj.matrix_world @ Vector(c) for c in obj.bound_box])
+            npt.assert_almost_equal(np.stack((corners.min(axis=0), corners.max(axis=0))), aabb)
+
+    def test_get_camera_frustum_planes(self):
+        planes = geometry.get_camera_frustum_planes(self._cam)
+        self.assertEqual((6, 4), planes.shape)
+        centers, radii = geometry.get_bounding_spheres([self._obj1, self._obj_non_visible])
+        self.assertTrue(geometry.test_spheres_in_frustum(planes, centers, radii)[0],
+                        'Visible object culled by frustum test')
+
     def test_get_world_to_object_transform(self):
         R = np.eye(3)
         c2o_pose = {'R': R, 't': np.array([0, 0, -20])}
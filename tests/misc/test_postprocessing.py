@@ -39,6 +39,9 @@ class TestPostprocessing(unittest.TestCase):
         box = pp.boundingbox_from_mask(self._mask)
         npt.assert_array_equal(self._test_box, box, err_msg='Bounding boxes do not match')
 
+    def test_bbox_from_empty_mask(self):
+        self.assertIsNone(pp.boundingbox_from_mask(np.zeros((10, 10))))
+
     def tearDown(self):
         self._mask = None
 
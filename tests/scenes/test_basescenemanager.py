@@ -40,6 +40,14 @@ class TestBaseSceneManager(unittest.TestCase):
         # this is not an active test but it should rise an error if something is wrong
         self._instance.set_environment_texture(expandpath(self._test_texture_path))
 
+    def test_get_image(self):
+        self._instance = bsm.BaseSceneManager()
+        filepath = expandpath(self._test_texture_path)
+        img = self._instance.get_image(filepath)
+        # a second request must not load the image again
+        self.assertIs(self._instance.get_image(filepath), img)
+        self.assertEqual(len(self._instance._image_cache), 1)
+
     def tearDown(self):
         del self._instance
 
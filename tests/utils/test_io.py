@@ -38,6 +38,12 @@ class TestIO(unittest.TestCase):
     def test_get_my_dir(self):
         self.assertEqual(os.getcwd(), io.get_my_dir('.'))
 
+    def test_get_format_width(self):
+        self.assertEqual(0, io.get_format_width(1))
+        self.assertEqual(1, io.get_format_width(10))
+        self.assertEqual(2, io.get_format_width(11))
+        self.assertEqual(3, io.get_format_width(1000))
+
     def tearDown(self):
         del os.environ[self._env_var]
 